@@ -26,6 +26,8 @@ class EarSettings(GNodeSettings):
     g_node_data_type: str = '{"EarDns": "localhost", "WorldInstanceAlias": "dwtest__1", "AtomicTNodeAliasList": ["dwtest.isone.ct.newhaven.orange1"], "ScadaAliasList": ["dwtest.isone.ct.newhaven.orange1.scada"], "TypeName": "ear.g.node.alias.list.toss", "Versiion": "100"}'
     my_fqdn: str = "d1-1.electricity.works"
     aws: AwsClient = AwsClient()
+    s3_upload_concurrency: int = 8
+    compress_json_payloads: bool = False
     slack: SlackClient = SlackClient()
     output_dir: str = "output"
     logging_on: bool = False
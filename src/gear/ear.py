@@ -1,16 +1,22 @@
 import uuid
 import time
 import os
-import json
+import gzip
+import io
+import queue
+import struct
 from pathlib import Path
 import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dataclasses import dataclass
-from typing import no_type_check
+from typing import Iterator, no_type_check
 import logging
+from datetime import datetime
 import boto3
 import botocore
-import pendulum
-from pydantic import BaseModel
+from botocore.config import Config
+from boto3.s3.transfer import TransferConfig
 from slack_sdk.webhook import WebhookClient
 
 from gridworks.enums import MessageCategory
@@ -22,7 +28,6 @@ from gridworks.enums import GNodeRole
 from gridworks.errors import SchemaError
 from gear.config import EarSettings
 from gear.utils import (
-    BasicLog,
     EarWarningType,
     send_warning_to_slack,
 )
@@ -40,14 +45,66 @@ DEV_OUTPUT_ROOT = "output/"
 
 MINIMUM_SCADA_REPORT_SECONDS = 10 * 60
 
-def get_folder_size(bucket, prefix):
+# Local cache rollup files: buffered frames are appended to one file per
+# minute rather than one file per message
+CACHE_ROLLUP_SUFFIX = ".rollup"
+CACHE_FLUSH_BYTES = 65536
+CACHE_FLUSH_SECONDS = 1
+CACHE_FRAME_HEADER = struct.Struct(">II")
+
+UPLOAD_QUEUE_SIZE = 10000
+PENDING_INDEX_MAX = 100000
+
+# Payloads at least this big go up as parallel multipart parts; 16 MiB
+# parts keep the request count down for multi-hundred-MB payloads
+MULTIPART_THRESHOLD_BYTES = 8 * 1024 * 1024
+MULTIPART_TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=MULTIPART_THRESHOLD_BYTES,
+    multipart_chunksize=16 * 1024 * 1024,
+    max_concurrency=10,
+    use_threads=True,
+)
+
+_s3_client = None
+
+# GNode aliases (and so the file names under an eventstore folder) are
+# lowercase alphanumeric, so sharding the listing on the first character
+# after the folder's trailing slash covers every key
+_FOLDER_SHARD_CHARS = "0123456789abcdefghijklmnopqrstuvwxyz"
+
+
+def _sum_prefix(bucket, prefix):
+    """Total bytes of the objects under one exact prefix, via the
+    ListObjectsV2 paginator (pages correctly past 1000 objects)."""
+    paginator = _s3_client.get_paginator("list_objects_v2")
     total_size = 0
-    for obj in boto3.resource("s3").Bucket(bucket).objects.filter(Prefix=prefix):
-        total_size += obj.size
+    for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+        total_size += sum(obj["Size"] for obj in page.get("Contents", ()))
     return total_size
 
 
-class MessagePlus(BaseModel):
+def get_folder_size(bucket, prefix):
+    """Total bytes stored under the folder at prefix.
+
+    The listing is sharded by the first character of the key after the
+    folder slash and the shards run on a thread pool, so a large folder
+    lists in parallel instead of one serial page stream. This relies on
+    file names starting with a lowercase alphanumeric GNode alias
+    character (see _FOLDER_SHARD_CHARS)."""
+    global _s3_client
+    if _s3_client is None:
+        _s3_client = boto3.client("s3")
+    if not prefix.endswith("/"):
+        prefix = prefix + "/"
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        totals = executor.map(
+            lambda char: _sum_prefix(bucket, prefix + char), _FOLDER_SHARD_CHARS
+        )
+    return sum(totals)
+
+
+@dataclass(slots=True)
+class MessagePlus:
     KafkaTopic: str
     TimeReceivedUnixMs: int
     LogNote: str
@@ -55,7 +112,7 @@ class MessagePlus(BaseModel):
 
 @dataclass
 class MessageState:
-    message_time: pendulum.datetime
+    message_time: datetime
     reported_state: bool
 
 class Ear(ActorBase):
@@ -72,33 +129,83 @@ class Ear(ActorBase):
             self.settings.universe_type_value, UniverseType, UniverseType.default()
         )
         self.check_universe_type()
-        self.s3_resource = boto3.resource("s3")
+        # One low-level client shared by all puts: thread-safe, and the large
+        # connection pool lets the cache-flush thread pool run in parallel
+        self.s3_client = boto3.client(
+            "s3",
+            region_name=self.settings.aws.region_name,
+            config=Config(
+                max_pool_connections=64,
+                retries={"max_attempts": 5, "mode": "adaptive"},
+                tcp_keepalive=True,
+            ),
+        )
         self.s3_put_works: bool = False
 
         self.local_cache_dir = f"output/need_to_put/{self.settings.world_instance_alias}"
         if not os.path.exists(self.local_cache_dir):
             os.makedirs(self.local_cache_dir)
+        # In a dev world the cache is flushed at most once per minute, not per message
+        self._dev_cache_flushed = False
+        # Payloads waiting to hit disk, framed as header + file_name + payload.
+        # Flushed to the current rollup file every CACHE_FLUSH_BYTES or
+        # CACHE_FLUSH_SECONDS, whichever comes first.
+        self._cache_buffer = bytearray()
+        self._cache_lock = threading.Lock()
+        self._cache_last_flush_s = time.time()
+        # In-memory index of every cached payload, so the hourly replay can
+        # upload without listing or reading files. The rollup files are the
+        # crash-safe backing; whenever the index might not cover the whole
+        # directory (capped out, or files left from a previous run),
+        # _pending_dropped forces the replay to scan the disk instead.
+        self._pending: deque[tuple[str, bytes]] = deque()
+        self._pending_dropped = len(os.listdir(self.local_cache_dir)) > 0
+
+        # my_fqdn never changes, so the file name tails are built once
+        self._suffix_txt = f"-{self.settings.my_fqdn}.txt"
+        self._suffix_json = f"-{self.settings.my_fqdn}.json"
 
         now = int(time.time())
-        self.webhook = WebhookClient(url=self.settings.slack.web_hook_url)
+        # The short timeout plus the single-worker pool keep a slow Slack
+        # from piling up work or stalling the cron thread
+        self.webhook = WebhookClient(url=self.settings.slack.web_hook_url, timeout=5)
+        self._slack_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="slack")
         self._messages_heard_this_hour = 0
+        # Keeps the no-messages warning to one per silent period
+        self._no_messages_warning_sent = False
+        self._cached_day: int = -1
+        self._cached_day_name: str = ""
         self._s3_time_based_subfolder_name = self.time_based_subfolder_name_from_unix_s(int(time.time()))
+        self._output_folder_root = (
+            f"{self.settings.world_instance_alias}/eventstore/{self._s3_time_based_subfolder_name}"
+        )
         self._last_min_cron_s = now - (now % 300)
         self._last_hour_cron_s = now - (now % 3600)
         self._last_day_cron_s = now - (now % 86400)
+        # The next cron boundaries are kept as plain ints, updated on each
+        # cron success, so the main loop compares rather than recomputes
+        self._next_min_cron_s = self._last_min_cron_s - (self._last_min_cron_s % 60) + 60
+        self._next_hour_cron_s = self._last_hour_cron_s - (self._last_hour_cron_s % 3600) + 3600
+        self._next_day_cron_s = self._last_day_cron_s - (self._last_day_cron_s % 86400) + 86400
+        now_ts = time.time()
         for file in [
             self.settings.minute_cron_file,
             self.settings.hour_cron_file,
             self.settings.day_cron_file,
         ]:
-            if not os.path.exists(file):
-                # The file does not exist, so create it
-                with open(file, "w") as outfile:
-                    outfile.write("")
-        os.utime(self.settings.day_cron_file,  (time.time(), time.time()))
-        os.utime(self.settings.hour_cron_file, (time.time(), time.time()))
-        os.utime(self.settings.minute_cron_file, (time.time(), time.time()))
+            # O_CREAT makes the file if needed, so no exists check, and
+            # touching via the fd needs no second path lookup
+            fd = os.open(file, os.O_WRONLY | os.O_CREAT, 0o644)
+            os.utime(fd, (now_ts, now_ts))
+            os.close(fd)
+        # Mirrors the hour cron file's mtime so cron_every_hour does not stat it
+        self._hour_cron_mtime_s = now_ts
         self.log_csv = f"output/debug_logs/ear_{str(uuid.uuid4()).split('-')[1]}.csv"
+        # Puts drain from this queue on uploader threads, so the rabbit
+        # callback never waits out an S3 round trip
+        self._upload_q: queue.Queue[tuple[str, bytes]] = queue.Queue(
+            maxsize=UPLOAD_QUEUE_SIZE
+        )
         self.main_thread = threading.Thread(target=self.main)
 
     def local_start(self) -> None:
@@ -106,6 +213,8 @@ class Ear(ActorBase):
         It cannot assume the rabbit channels are established and that
         messages can be received or sent."""
         self.main_thread.start()
+        for _ in range(self.settings.s3_upload_concurrency):
+            threading.Thread(target=self._uploader, daemon=True).start()
         self.actor_main_stopped = False
     
     def prepare_for_death(self) -> None:
@@ -113,7 +222,7 @@ class Ear(ActorBase):
 
     def local_stop(self) -> None:
         self.main_thread.join()
-    
+
     def check_universe_type(self) -> None:
         """Raises an exception if the  world root alias (found in settings)
         does not match the universe_type (also from settings)
@@ -182,23 +291,43 @@ class Ear(ActorBase):
 
         kafka_topic = f"{from_alias}-{type_name}"
         if msg_category == MessageCategory.RabbitGwSerial:
-            file_name = f"{kafka_topic}-{int(time.time() * 1000)}-{self.settings.my_fqdn}.txt"
+            suffix = self._suffix_txt
         else:
-            file_name = f"{kafka_topic}-{int(time.time() * 1000)}-{self.settings.my_fqdn}.json"
-        if self.s3_put_works:
-            success_putting_this_one = self.put_in_s3(file_name, body)
-        else:
-            success_putting_this_one = False
-
+            suffix = self._suffix_json
+        # One clock read per message: the ms stamp is what keeps same-topic
+        # file names distinct, so it cannot be shared across a burst
+        file_name = f"{kafka_topic}-{time.time_ns() // 1_000_000}{suffix}"
         if msg_category == MessageCategory.MqttJsonBroadcast:
             # unwrap the event
             ...
 
-        if not success_putting_this_one:
+        if self.s3_put_works:
+            try:
+                self._upload_q.put_nowait((file_name, body))
+            except queue.Full:
+                self.store_locally(file_name, body)
+        else:
             self.store_locally(file_name, body)
 
 
 
+    def _uploader(self) -> None:
+        """Drains the upload queue, falling back to the local cache when a
+        put fails. Runs on a handful of daemon threads started in
+        local_start."""
+        while self.actor_main_stopped is False:
+            try:
+                file_name, body = self._upload_q.get(timeout=1)
+            except queue.Empty:
+                continue
+            # Nothing may escape here: an uncaught exception would kill
+            # this daemon thread and silently shrink upload concurrency
+            try:
+                if not self.put_in_s3(file_name, body):
+                    self.store_locally(file_name, body)
+            except Exception:
+                LOGGER.exception("uploader could not handle %s", file_name)
+
     ######################
     # S3 related
     #######################
@@ -211,24 +340,38 @@ class Ear(ActorBase):
         """
         old_s3_time_based_subfolder_name = self._s3_time_based_subfolder_name
         self._s3_time_based_subfolder_name = self.time_based_subfolder_name_from_unix_s(int(time.time()))
-        return old_s3_time_based_subfolder_name != self._s3_time_based_subfolder_name
+        if old_s3_time_based_subfolder_name == self._s3_time_based_subfolder_name:
+            return False
+        self._output_folder_root = (
+            f"{self.settings.world_instance_alias}/eventstore/{self._s3_time_based_subfolder_name}"
+        )
+        return True
 
     @property
     def output_folder_root(self) -> str:
         """The data in S3 is stored in subfolders with a 'hw1__1/eventstore/YYYYMMDD' convention.
         Note that the world instance (hw1__1) is constant for an ear. The time-based subfolder
-        is updated in a daily cron job once there is more than 5 MB stored there."""
-        return f"{self.settings.world_instance_alias}/eventstore/{self._s3_time_based_subfolder_name}"
+        is updated in a daily cron job once there is more than 5 MB stored there. The string
+        only changes on that rollover, so it is cached rather than rebuilt per put."""
+        return self._output_folder_root
 
     def time_based_subfolder_name_from_unix_s(self, time_unix_s: int) -> str:
-        return pendulum.from_timestamp(time_unix_s).strftime("%Y%m%d")
+        day = time_unix_s // 86400
+        if day != self._cached_day:
+            self._cached_day = day
+            self._cached_day_name = time.strftime("%Y%m%d", time.gmtime(time_unix_s))
+        return self._cached_day_name
 
     def update_s3_put_works(self):
-        payload = json.dumps(
-            f'"EarDns": "{self.settings.my_fqdn}","UnixTimeMs": {int(time.time()) * 1000}'
-        )
-        world_alias = self.settings.world_instance_alias.split("__")[0]
-        self.put_in_s3(file_name=f"{world_alias}-heartbeat.a-0-{self.settings.my_fqdn}.txt", payload=payload)
+        """Refreshes s3_put_works with a HeadBucket probe. That is a free
+        reachability check, where the old heartbeat wrote a real object to
+        the bucket every minute just to see if writing works."""
+        try:
+            self.s3_client.head_bucket(Bucket=self.settings.aws.bucket_name)
+            self.s3_put_works = True
+        except Exception as e:
+            LOGGER.info("head_bucket failed: %s", e)
+            self.s3_put_works = False
 
     def put_in_s3(self, file_name: str, payload: str) -> bool:
         """The core function of this repo: take messages that the ear hears and
@@ -243,14 +386,42 @@ class Ear(ActorBase):
             True if the payload is loaded to S3 at the file_name, else False
         """
 
+        content_encoding = None
+        if self.settings.compress_json_payloads and file_name.endswith(".json"):
+            # Dict-heavy json payloads typically shrink 5-10x, a direct cut
+            # in put bandwidth and S3 storage. The .gz suffix lets
+            # downstream readers detect compressed objects
+            payload = gzip.compress(
+                payload.encode() if isinstance(payload, str) else payload
+            )
+            file_name = f"{file_name}.gz"
+            content_encoding = "gzip"
         path_name = f"{self.output_folder_root}/{file_name}"
-        print(f"self.output_folder_root is {self.output_folder_root} and file_name is {file_name}")
-        s3_object = self.s3_resource.Object(self.settings.aws.bucket_name, path_name)
+        LOGGER.debug("s3 put %s/%s", self.output_folder_root, file_name)
         s3_put_worked = False
         log_note = ""
         s3_put_result = None
         try:
-            s3_put_result = s3_object.put(Body=payload)
+            if len(payload) >= MULTIPART_THRESHOLD_BYTES:
+                # upload_fileobj signals success by not raising
+                body = payload.encode() if isinstance(payload, str) else payload
+                self.s3_client.upload_fileobj(
+                    io.BytesIO(body),
+                    self.settings.aws.bucket_name,
+                    path_name,
+                    ExtraArgs=(
+                        {"ContentEncoding": content_encoding} if content_encoding else None
+                    ),
+                    Config=MULTIPART_TRANSFER_CONFIG,
+                )
+                s3_put_worked = True
+            else:
+                put_kwargs = dict(
+                    Bucket=self.settings.aws.bucket_name, Key=path_name, Body=payload
+                )
+                if content_encoding:
+                    put_kwargs["ContentEncoding"] = content_encoding
+                s3_put_result = self.s3_client.put_object(**put_kwargs)
         except botocore.exceptions.ClientError as e:
             log_note = f"botocore.exceptions.ClientError: {e}"
         except botocore.exceptions.EndpointConnectionError as e:
@@ -259,26 +430,21 @@ class Ear(ActorBase):
             log_note = f"unknown error type {e}"
 
         if s3_put_result is not None:
-            if "ResponseMetadata" not in s3_put_result.keys():
+            status_code = s3_put_result.get("ResponseMetadata", {}).get("HTTPStatusCode")
+            if status_code == 200:
+                s3_put_worked = True
+            elif status_code is None:
                 log_note = "some uncaught error"
                 # we could set this to raise an exception in dev setting only
             else:
-                if "HTTPStatusCode" not in s3_put_result["ResponseMetadata"].keys():
-                    log_note = "some uncaught error"
-                else:
-                    if not s3_put_result["ResponseMetadata"]["HTTPStatusCode"] == 200:
-                        log_note = (
-                            f"HttpStatusCode {s3_put_result['ResponseMetadata']['HTTPStatusCode']} "
-                        )
-                    else:
-                        s3_put_worked = True
+                log_note = f"HttpStatusCode {status_code} "
 
         if s3_put_worked:
             # print(BasicLog.format("DEBUG", f"S3 put of {path_name} worked"))
             self.s3_put_works = True
             return True
         else:
-            print(BasicLog.format("INFO", log_note))
+            LOGGER.info("%s", log_note)
             self.s3_put_works = False
             return False
 
@@ -288,118 +454,253 @@ class Ear(ActorBase):
 
     def store_locally(self, file_name: str, payload: bytes):
         """Store message in folder output/need_to_put/world_intance_alias. Flush
-        that directory if world_type is dev"""
-        if self.universe_type == UniverseType.Dev:
-            print(
-                BasicLog.format(
-                    "DEBUG", f"dev world, so flushing all old data from {self.local_cache_dir}"
-                )
+        that directory if world_type is dev.
+
+        The payload is framed (with its file name, which is the S3 key on
+        replay) into an in-memory buffer that is appended to a per-minute
+        rollup file, so a burst of messages during an S3 outage costs one
+        write rather than one open/write/close per message."""
+        if self.universe_type == UniverseType.Dev and not self._dev_cache_flushed:
+            # Re-checked under the lock: several uploader threads can reach
+            # here at once, and only one of them should run the unlinks
+            with self._cache_lock:
+                if not self._dev_cache_flushed:
+                    LOGGER.debug(
+                        "dev world, so flushing all old data from %s", self.local_cache_dir
+                    )
+                    with os.scandir(self.local_cache_dir) as it:
+                        for entry in it:
+                            if entry.name.endswith((".json", ".txt", CACHE_ROLLUP_SUFFIX)):
+                                os.unlink(entry.path)
+                    self._dev_cache_flushed = True
+
+        name_bytes = file_name.encode()
+        frame = CACHE_FRAME_HEADER.pack(len(name_bytes), len(payload)) + name_bytes + payload
+        with self._cache_lock:
+            if len(self._pending) < PENDING_INDEX_MAX:
+                self._pending.append((file_name, payload))
+            else:
+                self._pending_dropped = True
+            self._cache_buffer += frame
+            now = time.time()
+            if (
+                len(self._cache_buffer) >= CACHE_FLUSH_BYTES
+                or now - self._cache_last_flush_s >= CACHE_FLUSH_SECONDS
+            ):
+                self._flush_cache_buffer(now)
+        LOGGER.debug("buffered %s for %s", file_name, self.local_cache_dir)
+
+    def _flush_cache_buffer(self, now: float) -> None:
+        """Append the buffered frames to the rollup file for the current minute.
+        Must be called with _cache_lock held."""
+        if len(self._cache_buffer) > 0:
+            minute = int(now) - (int(now) % 60)
+            rollup_path = f"{self.local_cache_dir}/{minute}{CACHE_ROLLUP_SUFFIX}"
+            # Raw os.open/os.write: one small append does not need the io
+            # module's BufferedWriter/FileIO pair
+            fd = os.open(
+                rollup_path,
+                os.O_WRONLY | os.O_CREAT | os.O_APPEND | os.O_CLOEXEC,
+                0o644,
             )
-            for subdir, dirs, files in os.walk(self.local_cache_dir):
-                for file in files:
-                    filepath = subdir + os.sep + file
-                    if filepath.endswith(".json"):
-                        os.system(f"rm {filepath}")
-                    if filepath.endswith(".txt"):
-                        os.system(f"rm {filepath}")
-
-        with open(f"{self.local_cache_dir}/{file_name}", "wb") as outfile:
-            outfile.write(payload)
-        print(BasicLog.format("DEBUG", f"wrote to {self.local_cache_dir}/{file_name}"))
+            try:
+                os.write(fd, bytes(self._cache_buffer))
+            finally:
+                os.close(fd)
+            self._cache_buffer.clear()
+        self._cache_last_flush_s = now
+
+    @staticmethod
+    def frames_in_rollup(blob: bytes) -> Iterator[tuple[str, bytes]]:
+        """Yield the (file_name, payload) frames stored in a rollup file."""
+        i = 0
+        while i + CACHE_FRAME_HEADER.size <= len(blob):
+            name_len, payload_len = CACHE_FRAME_HEADER.unpack_from(blob, i)
+            i += CACHE_FRAME_HEADER.size
+            file_name = blob[i : i + name_len].decode()
+            i += name_len
+            yield file_name, blob[i : i + payload_len]
+            i += payload_len
+
+    def _upload_one(self, file_name: str) -> tuple[str, bool]:
+        """Read one cached file and try to put it in s3. A rollup file holds
+        many framed messages, each put under its own key; it only counts as
+        uploaded if every frame made it. Returns the file name along with
+        whether the upload worked, for use by try_to_empty_cache."""
+        with open(f"{self.local_cache_dir}/{file_name}", "rb") as read_file:
+            payload = read_file.read()
+        if file_name.endswith(CACHE_ROLLUP_SUFFIX):
+            all_put = True
+            for framed_name, framed_payload in self.frames_in_rollup(payload):
+                if not self.put_in_s3(file_name=framed_name, payload=framed_payload):
+                    all_put = False
+            return file_name, all_put
+        return file_name, self.put_in_s3(file_name=file_name, payload=payload)
 
     def try_to_empty_cache(self):
-        """For each file in the relevant need_to_put subfolder,
-        try to put it in s3 and if successful, delete from subfolder
-
+        """Try to put every cached message in s3, deleting the cache files
+        once their contents are safely stored.
+
+        The usual pass replays from the in-memory index kept by
+        store_locally, so it needs no directory listing and no file reads;
+        the rollup files on disk only exist for crash safety. When the
+        index may not cover the whole directory (it is capped, and knows
+        nothing about files from a previous run or a failed disk pass) the
+        replay scans the disk instead. Either way the puts go out in
+        parallel on a thread pool.
         """
-        file_list = os.listdir(self.local_cache_dir)
-        for file_name in file_list:
-            with open(f"{self.local_cache_dir}/{file_name}", "rb") as read_file:
-                payload = read_file.read()
-                if self.put_in_s3(file_name=file_name, payload=payload):
-                    os.remove(f"{self.local_cache_dir}/{file_name}")
-                    print(
-                        BasicLog.format("INFO", f"Put cached {file_name} in S3 and deleted locally")
-                    )
+        now = time.time()
+        with self._cache_lock:
+            self._flush_cache_buffer(now)
+            pending = list(self._pending)
+            self._pending.clear()
+            index_complete = not self._pending_dropped
+            self._pending_dropped = False
+
+        if index_complete:
+            if len(pending) == 0:
+                return
+            with ThreadPoolExecutor(max_workers=32) as executor:
+                futures = {
+                    executor.submit(self.put_in_s3, file_name, payload): (file_name, payload)
+                    for file_name, payload in pending
+                }
+                failed = [futures[f] for f in as_completed(futures) if not f.result()]
+            if len(failed) == 0:
+                self._remove_cache_files(now)
+                LOGGER.info("Replayed %d cached messages from memory", len(pending))
+            else:
+                # Leave the rollup files alone; the failures stay indexed
+                # for the next pass
+                with self._cache_lock:
+                    self._pending.extend(failed)
+            return
+
+        # The current minute's rollup may still be receiving appends, so a
+        # read now could hit a torn frame; leave it for a later pass. It
+        # holds the frames just flushed from the index, so skipping it also
+        # means the index no longer covers the directory.
+        now_s = int(time.time())
+        current_rollup = f"{now_s - (now_s % 60)}{CACHE_ROLLUP_SUFFIX}"
+        skipped_current = False
+        file_names = []
+        with os.scandir(self.local_cache_dir) as it:
+            for entry in it:
+                if not entry.is_file():
+                    continue
+                if entry.name == current_rollup:
+                    skipped_current = True
+                    continue
+                file_names.append(entry.name)
+        any_failed = False
+        if len(file_names) > 0:
+            with ThreadPoolExecutor(max_workers=32) as executor:
+                futures = [
+                    executor.submit(self._upload_one, file_name) for file_name in file_names
+                ]
+                for future in as_completed(futures):
+                    file_name, put_worked = future.result()
+                    if put_worked:
+                        os.remove(f"{self.local_cache_dir}/{file_name}")
+                        LOGGER.info("Put cached %s in S3 and deleted locally", file_name)
+                    else:
+                        any_failed = True
+        if any_failed or skipped_current:
+            # Leftover files are not in the index, so the next pass must
+            # scan the disk again
+            with self._cache_lock:
+                self._pending_dropped = True
+
+    def _remove_cache_files(self, before_s: float) -> None:
+        """Deletes replayed cache files. Anything written at or since
+        before_s (the start of the replay pass) is kept: those frames were
+        not part of the pass, and store_locally may still be appending to
+        the newest rollup. A later pass picks them up."""
+        # Compare against the floor of before_s: on filesystems with
+        # one-second mtimes a file written just after the pass start could
+        # otherwise look older than it
+        with os.scandir(self.local_cache_dir) as it:
+            for entry in it:
+                if entry.stat().st_mtime < int(before_s):
+                    os.unlink(entry.path)
 
     ####################
     # Timing and scheduling related
     ####################
 
-    @property
-    def next_min_cron_s(self) -> int:
-        last_cron_s = self._last_min_cron_s - (self._last_min_cron_s % 60)
-        return last_cron_s + 60
-
-    @property
-    def next_hour_cron_s(self) -> int:
-        last_cron_s = self._last_hour_cron_s - (self._last_hour_cron_s % 3600)
-        return last_cron_s + 3600
-
-    @property
-    def next_day_cron_s(self) -> int:
-        last_day_s = self._last_day_cron_s - (self._last_day_cron_s % 86400)
-        return last_day_s + 86400
-
-    def time_for_min_cron(self) -> bool:
-        if time.time() > self.next_min_cron_s:
-            return True
-        return False
-
-    def time_for_hour_cron(self) -> bool:
-        if time.time() > self.next_hour_cron_s:
-            return True
-        return False
-
-    def time_for_day_cron(self) -> bool:
-        if time.time() > self.next_day_cron_s:
-            return True
-        return False
-
-    def cron_every_min_success(self):
-        self._last_min_cron_s = int(time.time())
-        os.utime(self.settings.minute_cron_file, (time.time(), time.time()))
-
-    def cron_every_hour_success(self):
-        print(BasicLog.format("INFO", "Ran cron every hour"))
-        self._last_hour_cron_s = int(time.time())
-        os.utime(self.settings.hour_cron_file, (time.time(), time.time()))
-
-    def cron_every_day_success(self):
-        self._last_day_cron_s = int(time.time())
-        print(BasicLog.format("INFO", "Ran cron every day"))
-        os.utime(self.settings.day_cron_file, (time.time(), time.time()))
-
-    def cron_every_min(self):
+    def cron_every_min_success(self, now: float):
+        self._last_min_cron_s = int(now)
+        os.utime(self.settings.minute_cron_file, (now, now))
+
+    def cron_every_hour_success(self, now: float):
+        LOGGER.info("Ran cron every hour")
+        self._last_hour_cron_s = int(now)
+        os.utime(self.settings.hour_cron_file, (now, now))
+        self._hour_cron_mtime_s = now
+
+    def cron_every_day_success(self, now: float):
+        self._last_day_cron_s = int(now)
+        LOGGER.info("Ran cron every day")
+        os.utime(self.settings.day_cron_file, (now, now))
+
+    def cron_every_min(self, now: float):
+        # The next boundary advances whether or not the body succeeds;
+        # otherwise a failing cron would leave it in the past and pin the
+        # main loop's sleep at its floor. The cron file mtimes remain the
+        # record of the last *successful* run.
+        now_s = int(now)
+        self._next_min_cron_s = now_s - (now_s % 60) + 60
+        self._dev_cache_flushed = False
+        # With sparse traffic nothing else writes the buffered tail to
+        # disk, so bound its memory-only exposure at one minute
+        with self._cache_lock:
+            self._flush_cache_buffer(now)
         self.update_s3_put_works()
-        self.cron_every_min_success()
+        self.cron_every_min_success(now)
 
-    def cron_every_hour(self):
+    def cron_every_hour(self, now: float):
+        now_s = int(now)
+        self._next_hour_cron_s = now_s - (now_s % 3600) + 3600
         if self._messages_heard_this_hour == 0:
-            if (time.time() - os.path.getmtime(self.settings.hour_cron_file)) > 1800:
+            if (now - self._hour_cron_mtime_s) > 1800 and not self._no_messages_warning_sent:
                 warning_message = f"Ear service {self.settings.my_fqdn} heard 0 messages last hour"
-                print(BasicLog.format("WARNING", warning_message))
-                response_status_code = send_warning_to_slack(
+                LOGGER.warning("%s", warning_message)
+                self._slack_pool.submit(
+                    send_warning_to_slack,
                     webhook=self.webhook,
                     warning_type=EarWarningType.EAR_HEARD_NO_MESSAGES_FOR_AN_HOUR,
                     warning_message=warning_message,
                 )
+                self._no_messages_warning_sent = True
+        else:
+            self._no_messages_warning_sent = False
         self._messages_heard_this_hour = 0
         if self.s3_put_works:
             self.try_to_empty_cache()
-            self.cron_every_hour_success()
+            self.cron_every_hour_success(now)
 
-    def cron_every_day(self):
+    def cron_every_day(self, now: float):
+        now_s = int(now)
+        self._next_day_cron_s = now_s - (now_s % 86400) + 86400
         self.possibly_update_s3_folder()
-        self.cron_every_day_success()
+        self.cron_every_day_success(now)
 
     def main(self):
         while self.actor_main_stopped is False:
-            if self.time_for_min_cron():
-                self.cron_every_min()
-            if self.time_for_hour_cron():
-                self.cron_every_hour()
-            if self.time_for_day_cron():
-                self.cron_every_day()
-
-            responsive_sleep(self, 1)
\ No newline at end of file
+            now = time.time()
+            if now > self._next_min_cron_s:
+                self.cron_every_min(now)
+            if now > self._next_hour_cron_s:
+                self.cron_every_hour(now)
+            if now > self._next_day_cron_s:
+                self.cron_every_day(now)
+
+            # Sleep straight through to the next cron boundary instead of
+            # waking every second; responsive_sleep still exits early on
+            # shutdown
+            sleep_s = max(
+                0.1,
+                min(self._next_min_cron_s, self._next_hour_cron_s, self._next_day_cron_s)
+                - time.time(),
+            )
+            responsive_sleep(self, sleep_s)
\ No newline at end of file
@@ -1,11 +1,14 @@
-import json
+import contextlib
+import gzip
 import os
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import NamedTuple
 
 import boto3
 import botocore
-import pendulum
+from botocore.config import Config
 from slack_sdk.webhook import WebhookClient
 
 from gear.config import EarSettings
@@ -22,13 +25,6 @@ from utils import (
 DEV_OUTPUT_ROOT = "output/"
 
 
-def get_folder_size(bucket, prefix):
-    total_size = 0
-    for obj in boto3.resource("s3").Bucket(bucket).objects.filter(Prefix=prefix):
-        total_size += obj.size
-    return total_size
-
-
 class MessagePlus(NamedTuple):
     KafkaTopic: str
     TimeReceivedUnixMs: int
@@ -42,20 +38,60 @@ class Ear(EarBase):
     def __init__(self, settings: EarSettings):
         super(Ear, self).__init__(settings=settings)
         self.settings=settings
-        self.s3_resource = boto3.resource("s3")
+        # One low-level client for every S3 call: thread-safe, keep-alive
+        # connections that survive between puts, and adaptive retries in
+        # place of hand-rolled reconnect handling
+        self.s3_client = boto3.client(
+            "s3",
+            config=Config(
+                max_pool_connections=32,
+                retries={"max_attempts": 3, "mode": "adaptive"},
+                tcp_keepalive=True,
+            ),
+        )
         self.s3_put_works: bool = False
+        # Bytes put under the current time-based subfolder, maintained on
+        # every successful put so the daily cron does not have to list the
+        # whole prefix. Starts at zero, so the count is approximate until
+        # the first rollover after a restart.
+        self._s3_folder_bytes = 0
+        self._s3_folder_bytes_lock = threading.Lock()
+        # Puts run on this pool so the MQTT callback is never blocked on an
+        # S3 round trip
+        self._upload_pool = ThreadPoolExecutor(
+            max_workers=settings.s3_upload_concurrency, thread_name_prefix="s3-upload"
+        )
+        # Slack posts are fire-and-forget so a Slack outage cannot stall the
+        # cron loop
+        self._notify_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="slack")
+
+        # Alias-derived strings are computed once; the alias never changes
+        self._world_instance_alias = self.settings.g_node_data.WorldInstanceAlias
+        self._alias_root = self._world_instance_alias.split(".", 1)[0]
 
-        self.local_cache_dir = f"output/need_to_put/{self.settings.g_node_data.WorldInstanceAlias}"
+        self.local_cache_dir = f"output/need_to_put/{self._world_instance_alias}"
         if not os.path.exists(self.local_cache_dir):
             os.makedirs(self.local_cache_dir)
 
         now = int(time.time())
         self.webhook = WebhookClient(url=self.settings.slack.web_hook_url)
         self._messages_heard_this_hour = 0
+        # Both are fixed between daily rollovers, so neither is recomputed
+        # per message
+        self._world_type = self._compute_world_type()
         self._s3_time_based_subfolder_name = self.time_based_subfolder_name_from_unix_s(time.time())
+        self._output_folder_root = (
+            f"{self._world_instance_alias}/eventstore/"
+            f"{self._s3_time_based_subfolder_name}"
+        )
         self._last_min_cron_s = now - (now % 300)
         self._last_hour_cron_s = now - (now % 3600)
         self._last_day_cron_s = now - (now % 86400)
+        # Plain-int boundaries the 1-second poll loop compares against;
+        # recomputed only when a cron runs, not on every tick
+        self._next_min_cron_s = now - (now % 60) + 60
+        self._next_hour_cron_s = now - (now % 3600) + 3600
+        self._next_day_cron_s = now - (now % 86400) + 86400
         os.utime(self.settings.day_cron_file,  (time.time(), time.time()))
         os.utime(self.settings.hour_cron_file, (time.time(), time.time()))
         os.utime(self.settings.minute_cron_file, (time.time(), time.time()))
@@ -68,6 +104,11 @@ class Ear(EarBase):
 
     @property
     def world_type(self) -> WorldType:
+        """The WorldType: Dev, Shadow or Real. Computed once at init from
+        the world root alias, since the alias never changes."""
+        return self._world_type
+
+    def _compute_world_type(self) -> WorldType:
         """Returns the WorldType: Dev, Shadow or Real, depending on the
         world root alias (found in settings).
 
@@ -86,7 +127,7 @@ class Ear(EarBase):
         'w'.
         """
 
-        root_alias = self.settings.g_node_data.WorldInstanceAlias.split(".")[0]
+        root_alias = self._alias_root
         if root_alias == "w":
             return WorldType.REAL
         if root_alias.startswith("dw"):
@@ -103,18 +144,40 @@ class Ear(EarBase):
         self._messages_heard_this_hour += 1
         self.kafka_topic = kafka_topic
         self.payload = payload
+        ts_ms = time.time_ns() // 1_000_000
         if message_format_type == MessageFormatType.GW_SERIAL:
-            file_name = f"{kafka_topic}-{int(time.time() * 1000)}-{self.settings.my_fqdn}.txt"
+            file_name = f"{kafka_topic}-{ts_ms}-{self.settings.my_fqdn}.txt"
         else:
-            file_name = f"{kafka_topic}-{int(time.time() * 1000)}-{self.settings.my_fqdn}.json"
+            file_name = f"{kafka_topic}-{ts_ms}-{self.settings.my_fqdn}.json"
 
         if self.s3_put_works:
-            success_putting_this_one = self.put_in_s3(file_name, payload)
+            self._upload_pool.submit(self._upload_with_retry, file_name, payload)
         else:
-            success_putting_this_one = False
+            self.store_locally(file_name, payload)
 
-        if not success_putting_this_one:
+    def _upload_with_retry(self, file_name: str, payload: bytes) -> None:
+        """Tries the put three times with exponential backoff, storing the
+        payload locally once S3 has stayed unreachable. Runs on the upload
+        pool, never on the MQTT callback thread."""
+        for attempt in range(3):
+            if self.put_in_s3(file_name=file_name, payload=payload):
+                return
+            time.sleep(2**attempt)
+        # Nobody checks the submitted Future, so an exception out of the
+        # fallback would discard the message without a trace
+        try:
             self.store_locally(file_name, payload)
+        except Exception as e:
+            log_note = f"local cache write of {file_name} failed, message lost: {e}"
+            print(BasicLog.format("WARNING", log_note))
+            self.mqtt_log_hack([BasicLog.format("WARNING", log_note)])
+
+    def stop(self):
+        super(Ear, self).stop()
+        # Drain any puts still in flight before exiting
+        self._upload_pool.shutdown(wait=True)
+        self._notify_pool.shutdown(wait=False)
+        self._flush_log()
 
     ######################
     # S3 related
@@ -122,16 +185,25 @@ class Ear(EarBase):
 
     def possibly_update_s3_folder(self) -> bool:
         """Checks if the curent output folder has more than 5 MB in it. If yes, it
-        sets the time based subfolder name based on the time right now.
+        sets the time based subfolder name based on the time right now. The folder
+        size comes from the in-memory counter kept by the put paths, not from
+        listing the prefix.
 
         Returns:
             bool: True if a new folder has been created, false otherwise.
         """
-        size_bytes = get_folder_size(self.settings.aws.bucket_name, self.output_folder_root)
+        with self._s3_folder_bytes_lock:
+            size_bytes = self._s3_folder_bytes
         if size_bytes > self.NEW_FOLDER_TRIGGER_MEGA_BYTES * 10**6:
             candidate_new = self.time_based_subfolder_name_from_unix_s(time.time())
             if candidate_new != self._s3_time_based_subfolder_name:
                 self._s3_time_based_subfolder_name = candidate_new
+                self._output_folder_root = (
+                    f"{self._world_instance_alias}/eventstore/"
+                    f"{self._s3_time_based_subfolder_name}"
+                )
+                with self._s3_folder_bytes_lock:
+                    self._s3_folder_bytes = 0
                 print(f"output_folder_root is now {self.output_folder_root}")
                 return True
             return False
@@ -141,18 +213,23 @@ class Ear(EarBase):
     def output_folder_root(self) -> str:
         """The data in S3 is stored in subfolders with a 'hw1__1/eventstore/YYYYMMDD' convention.
         Note that the world instance (hw1__1) is constant for an ear. The time-based subfolder
-        is updated in a daily cron job once there is more than 5 MB stored there."""
-        return f"{self.settings.g_node_data.WorldInstanceAlias}/eventstore/{self._s3_time_based_subfolder_name}"
+        is updated in a daily cron job once there is more than 5 MB stored there. The string
+        only changes at that rollover, so it is cached rather than rebuilt per put."""
+        return self._output_folder_root
 
     def time_based_subfolder_name_from_unix_s(self, time_unix_s: int) -> str:
-        return pendulum.from_timestamp(time_unix_s).strftime("%Y%m%d")
+        return time.strftime("%Y%m%d", time.gmtime(time_unix_s))
 
     def update_s3_put_works(self):
-        payload = json.dumps(
-            f'"EarDns": "{self.settings.my_fqdn}","UnixTimeMs": {int(time.time()) * 1000}'
-        )
-        world_alias = self.settings.g_node_data.WorldInstanceAlias.split("__")[0]
-        self.put_in_s3(file_name=f"{world_alias}-heartbeat.a-0-{self.settings.my_fqdn}.txt", payload=payload)
+        """Refreshes s3_put_works with a HeadBucket probe. That is a free
+        reachability check, where the old heartbeat wrote a real object to
+        the bucket every minute just to see if writing works."""
+        try:
+            self.s3_client.head_bucket(Bucket=self.settings.aws.bucket_name)
+            self.s3_put_works = True
+        except Exception as e:
+            self.mqtt_log_hack([BasicLog.format("INFO", f"head_bucket failed: {e}")])
+            self.s3_put_works = False
 
     def put_in_s3(self, file_name: str, payload: str) -> bool:
         """The core function of this repo: take messages that the ear hears and
@@ -167,14 +244,29 @@ class Ear(EarBase):
             True if the payload is loaded to S3 at the file_name, else False
         """
 
+        content_encoding = None
+        if self.settings.compress_json_payloads and file_name.endswith(".json"):
+            # Dict-heavy json payloads typically shrink 5-10x, a direct cut
+            # in put bandwidth and S3 storage. The .gz suffix lets
+            # downstream readers detect compressed objects
+            payload = gzip.compress(
+                payload.encode() if isinstance(payload, str) else payload
+            )
+            file_name = f"{file_name}.gz"
+            content_encoding = "gzip"
         path_name = f"{self.output_folder_root}/{file_name}"
-        print(f"self.output_folder_root is {self.output_folder_root} and file_name is {file_name}")
-        s3_object = self.s3_resource.Object(self.settings.aws.bucket_name, path_name)
+        if self.settings.log_message_summary:
+            print(f"self.output_folder_root is {self.output_folder_root} and file_name is {file_name}")
         s3_put_worked = False
         log_note = ""
         s3_put_result = None
         try:
-            s3_put_result = s3_object.put(Body=payload)
+            put_kwargs = dict(
+                Bucket=self.settings.aws.bucket_name, Key=path_name, Body=payload
+            )
+            if content_encoding:
+                put_kwargs["ContentEncoding"] = content_encoding
+            s3_put_result = self.s3_client.put_object(**put_kwargs)
         except botocore.exceptions.ClientError as e:
             log_note = f"botocore.exceptions.ClientError: {e}"
         except botocore.exceptions.EndpointConnectionError as e:
@@ -183,26 +275,26 @@ class Ear(EarBase):
             log_note = f"unknown error type {e}"
 
         if s3_put_result is not None:
-            if "ResponseMetadata" not in s3_put_result.keys():
+            try:
+                code = s3_put_result["ResponseMetadata"]["HTTPStatusCode"]
+                if code == 200:
+                    s3_put_worked = True
+                else:
+                    log_note = f"HttpStatusCode {code} "
+            except (KeyError, TypeError):
                 log_note = "some uncaught error"
                 # we could set this to raise an exception in dev setting only
-            else:
-                if "HTTPStatusCode" not in s3_put_result["ResponseMetadata"].keys():
-                    log_note = "some uncaught error"
-                else:
-                    if not s3_put_result["ResponseMetadata"]["HTTPStatusCode"] == 200:
-                        log_note = (
-                            f"HttpStatusCode {s3_put_result['ResponseMetadata']['HTTPStatusCode']} "
-                        )
-                    else:
-                        s3_put_worked = True
 
         if s3_put_worked:
             # print(BasicLog.format("DEBUG", f"S3 put of {path_name} worked"))
+            with self._s3_folder_bytes_lock:
+                self._s3_folder_bytes += len(payload)
             self.s3_put_works = True
             return True
         else:
-            print(BasicLog.format("INFO", log_note))
+            # Deferred via the log buffer so a failing put does not also pay
+            # for a synchronous stdout write
+            self.mqtt_log_hack([BasicLog.format("INFO", log_note)])
             self.s3_put_works = False
             return False
 
@@ -214,90 +306,121 @@ class Ear(EarBase):
         """Store message in folder output/need_to_put/world_intance_alias. Flush
         that directory if world_type is dev"""
         if self.world_type == WorldType.DEV:
-            print(
-                BasicLog.format(
-                    "DEBUG", f"dev world, so flushing all old data from {self.local_cache_dir}"
+            if self.settings.log_message_summary:
+                print(
+                    BasicLog.format(
+                        "DEBUG", f"dev world, so flushing all old data from {self.local_cache_dir}"
+                    )
                 )
-            )
-            for subdir, dirs, files in os.walk(self.local_cache_dir):
-                for file in files:
-                    filepath = subdir + os.sep + file
-                    if filepath.endswith(".json"):
-                        os.system(f"rm {filepath}")
-                    if filepath.endswith(".txt"):
-                        os.system(f"rm {filepath}")
-
-        with open(f"{self.local_cache_dir}/{file_name}", "wb") as outfile:
-            outfile.write(payload)
-        print(BasicLog.format("DEBUG", f"wrote to {self.local_cache_dir}/{file_name}"))
+            # The cache dir is flat, so one scandir pass beats walking a
+            # tree that has no subdirectories. Several pool workers can
+            # flush at once, so a file deleted by another worker is fine
+            with os.scandir(self.local_cache_dir) as it:
+                for entry in it:
+                    if entry.is_file(follow_symlinks=False) and entry.name.endswith(
+                        (".json", ".txt")
+                    ):
+                        with contextlib.suppress(FileNotFoundError):
+                            os.unlink(entry.path)
+
+        # Write-then-rename so try_to_empty_cache's concurrent scan never
+        # sees (and uploads) a half-written file
+        tmp_path = f"{self.local_cache_dir}/.{file_name}.tmp"
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            os.write(fd, payload)
+        finally:
+            os.close(fd)
+        os.replace(tmp_path, f"{self.local_cache_dir}/{file_name}")
+        if self.settings.log_message_summary:
+            print(BasicLog.format("DEBUG", f"wrote to {self.local_cache_dir}/{file_name}"))
+
+    def _flush_one(self, file_name: str) -> bool:
+        """Stream one cached file to s3 through the shared client, deleting
+        it locally on success. The open handle goes straight to boto3's
+        chunked reader, so the payload is never held in memory whole.
+        Returns True if the file made it to S3."""
+        path = f"{self.local_cache_dir}/{file_name}"
+        try:
+            with open(path, "rb") as read_file:
+                size_bytes = os.fstat(read_file.fileno()).st_size
+                self.s3_client.upload_fileobj(
+                    read_file,
+                    self.settings.aws.bucket_name,
+                    f"{self.output_folder_root}/{file_name}",
+                )
+        except Exception as e:
+            print(BasicLog.format("INFO", f"cache flush of {file_name} failed: {e}"))
+            return False
+        os.remove(path)
+        with self._s3_folder_bytes_lock:
+            self._s3_folder_bytes += size_bytes
+        print(BasicLog.format("INFO", f"Put cached {file_name} in S3 and deleted locally"))
+        return True
 
     def try_to_empty_cache(self) -> "bool":
         """For each file in the relevant need_to_put subfolder,
-        try to put it in s3 and if successful, delete from subfolder
+        try to put it in s3 and if successful, delete from subfolder.
+        The puts run in parallel on a thread pool, so a backlog from an
+        S3 outage flushes in roughly num_files/16 round trips.
 
         Returns:
             bool:True if subfolder is empty at the end
         """
-        file_list = os.listdir(self.local_cache_dir)
-        for file_name in file_list:
-            with open(f"{self.local_cache_dir}/{file_name}", "rb") as read_file:
-                payload = read_file.read()
-                if self.put_in_s3(file_name=file_name, payload=payload):
-                    os.remove(f"{self.local_cache_dir}/{file_name}")
-                    print(
-                        BasicLog.format("INFO", f"Put cached {file_name} in S3 and deleted locally")
-                    )
+        # store_locally writes through dot-prefixed .tmp files; skip them so
+        # a concurrent flush never uploads (and deletes) a half-written one
+        with os.scandir(self.local_cache_dir) as it:
+            file_list = [
+                entry.name
+                for entry in it
+                if entry.is_file() and not entry.name.startswith(".")
+            ]
+        with ThreadPoolExecutor(max_workers=16) as executor:
+            list(executor.map(self._flush_one, file_list))
+        return len(os.listdir(self.local_cache_dir)) == 0
 
     ####################
     # Timing and scheduling related
     ####################
 
-    @property
-    def next_min_cron_s(self) -> int:
-        last_cron_s = self._last_min_cron_s - (self._last_min_cron_s % 60)
-        return last_cron_s + 60
-
-    @property
-    def next_hour_cron_s(self) -> int:
-        last_cron_s = self._last_hour_cron_s - (self._last_hour_cron_s % 3600)
-        return last_cron_s + 3600
-
-    @property
-    def next_day_cron_s(self) -> int:
-        last_day_s = self._last_day_cron_s - (self._last_day_cron_s % 86400)
-        return last_day_s + 86400
-
     def time_for_min_cron(self) -> bool:
-        if time.time() > self.next_min_cron_s:
+        if time.time() > self._next_min_cron_s:
             return True
         return False
 
     def time_for_hour_cron(self) -> bool:
-        if time.time() > self.next_hour_cron_s:
+        if time.time() > self._next_hour_cron_s:
             return True
         return False
 
     def time_for_day_cron(self) -> bool:
-        if time.time() > self.next_day_cron_s:
+        if time.time() > self._next_day_cron_s:
             return True
         return False
 
     def cron_every_min_success(self):
-        self._last_min_cron_s = int(time.time())
-        os.utime(self.settings.minute_cron_file, (time.time(), time.time()))
+        now = time.time()
+        self._last_min_cron_s = int(now)
+        self._next_min_cron_s = self._last_min_cron_s - (self._last_min_cron_s % 60) + 60
+        os.utime(self.settings.minute_cron_file, (now, now))
 
     def cron_every_hour_success(self):
         print(BasicLog.format("INFO", "Ran cron every hour"))
-        self._last_hour_cron_s = int(time.time())
-        os.utime(self.settings.hour_cron_file, (time.time(), time.time()))
+        now = time.time()
+        self._last_hour_cron_s = int(now)
+        self._next_hour_cron_s = self._last_hour_cron_s - (self._last_hour_cron_s % 3600) + 3600
+        os.utime(self.settings.hour_cron_file, (now, now))
 
     def cron_every_day_success(self):
-        self._last_day_cron_s = int(time.time())
+        now = time.time()
+        self._last_day_cron_s = int(now)
+        self._next_day_cron_s = self._last_day_cron_s - (self._last_day_cron_s % 86400) + 86400
         print(BasicLog.format("INFO", "Ran cron every day"))
-        os.utime(self.settings.day_cron_file, (time.time(), time.time()))
+        os.utime(self.settings.day_cron_file, (now, now))
 
     def cron_every_min(self):
         self.update_s3_put_works()
+        self._flush_log()
         self.cron_every_min_success()
 
     def cron_every_hour(self):
@@ -305,7 +428,8 @@ class Ear(EarBase):
             if (time.time() - os.path.getmtime(self.settings.hour_cron_file)) > 1800:
                 warning_message = f"Ear service {self.settings.my_fqdn} heard 0 messages last hour"
                 print(BasicLog.format("WARNING", warning_message))
-                response_status_code = send_warning_to_slack(
+                self._notify_pool.submit(
+                    send_warning_to_slack,
                     webhook=self.webhook,
                     warning_type=EarWarningType.EAR_HEARD_NO_MESSAGES_FOR_AN_HOUR,
                     warning_message=warning_message,
@@ -5,6 +5,7 @@ import os
 import threading
 import uuid
 from abc import ABC, abstractmethod
+from collections import deque
 from typing import List
 
 from schemata.errors import SchemaError
@@ -28,6 +29,13 @@ class EarBase(ABC):
     ATN_SERIAL_MESSAGE_TYPE_ALIAS_LIST = ["gs.pwr.100"]
     ATN_JSON_MESSAGE_TYPE_ALIAS_LIST = ["gt.dispatch.boolean.100", "gt.sh.cli.atn.cmd.110", "gt.telemetry.110"]
     LOCAL_SENSOR_TYPE_ALIAS_LIST = ["gt.telemetry.110"]
+    # Derived from the lists above once at class creation, so the MQTT
+    # callback and topic building do not re-concatenate them per message
+    _SERIAL_TYPES = frozenset(
+        ATN_SERIAL_MESSAGE_TYPE_ALIAS_LIST + SCADA_SERIAL_MESSAGE_TYPE_ALIAS_LIST
+    )
+    _ATN_TYPES = ATN_JSON_MESSAGE_TYPE_ALIAS_LIST + ATN_SERIAL_MESSAGE_TYPE_ALIAS_LIST
+    _SCADA_TYPES = SCADA_JSON_MESSAGE_TYPE_ALIAS_LIST + SCADA_SERIAL_MESSAGE_TYPE_ALIAS_LIST
 
     def __init__(self, settings: EarSettings):
         self._main_loop_running = False
@@ -37,7 +45,25 @@ class EarBase(ABC):
             self.settings.g_node_data = EarGNodeAliasListToss_Maker.type_to_tuple(self.settings.g_node_data_type)
         except SchemaError as e:
             raise Exception(f"Error in settings. check .env: {e}")
+        # The alias lists never change after settings load, so the topic and
+        # subscription lists are built once instead of on every (re)connect
+        self._recognized_topics = self._build_recognized_topics()
+        self._subscriptions = [
+            Subscription(
+                Topic=f"{mqtt_topic_encode(topic)}",
+                Qos=QOS.AtLeastOnce,
+            )
+            for topic in self._recognized_topics
+        ]
+        self._subscription_tuples = [
+            (subscription.Topic, subscription.Qos.value)
+            for subscription in self._subscriptions
+        ]
         self.log_csv = f"output/debug_logs/earbase_{str(uuid.uuid4()).split('-')[1]}.csv"
+        # Log rows buffer here and hit the CSV once a minute, instead of an
+        # open/write/close per MQTT callback
+        self._log_buf: deque = deque()
+        self._log_lock = threading.Lock()
         self.client_id = "-".join(str(uuid.uuid4()).split("-")[:-1])
         self.client = mqtt.Client(self.client_id)
         self.client.username_pw_set(
@@ -70,16 +96,15 @@ class EarBase(ABC):
         return ["a.garage.temp1", "a.tank.out.temp1", "a.tank.in.temp1", "a.tank.temp0"]
 
     def recognized_topics(self) -> List[str]:
+        return self._recognized_topics
+
+    def _build_recognized_topics(self) -> List[str]:
         topics = []
         for g_node_alias in self.my_atn_alias_list():
-            for message_type_alias in (
-                self.ATN_JSON_MESSAGE_TYPE_ALIAS_LIST + self.ATN_SERIAL_MESSAGE_TYPE_ALIAS_LIST
-            ):
+            for message_type_alias in self._ATN_TYPES:
                 topics.append(f"gw/{g_node_alias}/{message_type_alias}")
         for g_node_alias in self.my_scada_alias_list():
-            for message_type_alias in (
-                self.SCADA_JSON_MESSAGE_TYPE_ALIAS_LIST + self.SCADA_SERIAL_MESSAGE_TYPE_ALIAS_LIST
-            ):
+            for message_type_alias in self._SCADA_TYPES:
                 topics.append(f"gw/{g_node_alias}/{message_type_alias}")
         for alias in self.my_local_sensor_hack_list():
             for message_type_alias in (
@@ -89,29 +114,31 @@ class EarBase(ABC):
         return topics
 
     def subscriptions(self) -> List[Subscription]:
-        subscriptions = []
-        for topic in self.recognized_topics():
-            subscriptions += [
-                Subscription(
-                    Topic=f"{mqtt_topic_encode(topic)}",
-                    Qos=QOS.AtLeastOnce,
-                ),
-            ]
-        return subscriptions
+        return self._subscriptions
 
     def subscribe(self):
-        subscriptions = list(map(lambda x: (f"{x.Topic}", x.Qos.value), self.subscriptions()))
         if self.settings.log_message_summary:
             print(BasicLog.format("DEBUG", f"Subscribing to:"))
-            for i, (topic, _) in enumerate(subscriptions):
+            for topic, _ in self._subscription_tuples:
                 print(BasicLog.format("DEBUG", f"  {topic}"))
-        self.client.subscribe(subscriptions)
+        self.client.subscribe(self._subscription_tuples)
 
     def mqtt_log_hack(self, row):
         if self.settings.logging_on:
-            with open(self.log_csv, "a") as outfile:
-                write = csv.writer(outfile, delimiter=",")
-                write.writerow(row)
+            with self._log_lock:
+                self._log_buf.append(row)
+
+    def _flush_log(self):
+        """Writes all buffered log rows with a single csv writer. Called
+        from the minute cron."""
+        with self._log_lock:
+            if len(self._log_buf) == 0:
+                return
+            rows = list(self._log_buf)
+            self._log_buf.clear()
+        with open(self.log_csv, "a", buffering=1 << 16) as outfile:
+            write = csv.writer(outfile, delimiter=",")
+            write.writerows(rows)
 
     # noinspection PyUnusedLocal
     def on_log(self, client, userdata, level, buf):
@@ -154,10 +181,7 @@ class EarBase(ABC):
         else:
             from_alias = words[0]
             type_alias = words[1]
-        if (
-            type_alias
-            in self.ATN_SERIAL_MESSAGE_TYPE_ALIAS_LIST + self.SCADA_SERIAL_MESSAGE_TYPE_ALIAS_LIST
-        ):
+        if type_alias in self._SERIAL_TYPES:
             message_format_type = MessageFormatType.GW_SERIAL
         else:
             message_format_type = MessageFormatType.JSON
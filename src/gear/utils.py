@@ -1,10 +1,9 @@
 import enum
 import time
+from datetime import datetime, timezone
 from typing import Any, NamedTuple, Optional
 from slack_sdk.webhook import WebhookClient
 
-import pendulum
-
 DEFAULT_STEP_DURATION = 0.1
 
 
@@ -31,14 +30,15 @@ class EarWarningType(enum.Enum):
     EAR_HEARD_NO_MESSAGES_FOR_AN_HOUR = "EarHeardNoMessagesForAnHour"
 
 
-def send_warning_to_slack(
-    webhook: WebhookClient, 
-    warning_type: EarWarningType, 
-    warning_message: str,
+def _post_to_slack(
+    webhook: WebhookClient,
+    header: str,
+    warning_type: EarWarningType,
+    message: str,
 ) -> str:
-    """ Requires a webhook loaded with the webhook url from ear.settings and
-    should be used to send a  warning message.  Returns the response code from 
-    the WebHookClient"""
+    """Sends one block-formatted message through the webhook. Both senders
+    share this, so the nested block structure is built in exactly one place.
+    Returns the response code from the WebHookClient"""
     response = webhook.send(
         text="fallback",
         blocks=[
@@ -46,7 +46,7 @@ def send_warning_to_slack(
                 "type": "section",
                 "text": {
                     "type": "mrkdwn",
-                    "text": f"*S3 Ear Warning!:*\n {warning_type.value}: {warning_message}"
+                    "text": f"*{header}*\n {warning_type.value}: {message}"
                 }
             }
         ]
@@ -58,35 +58,30 @@ def send_warning_to_slack(
     return status_code
 
 
+def send_warning_to_slack(
+    webhook: WebhookClient,
+    warning_type: EarWarningType,
+    warning_message: str,
+) -> str:
+    """ Requires a webhook loaded with the webhook url from ear.settings and
+    should be used to send a  warning message.  Returns the response code from
+    the WebHookClient"""
+    return _post_to_slack(webhook, "S3 Ear Warning!:", warning_type, warning_message)
+
+
 def send_recovery_to_slack(
-    webhook: WebhookClient, 
-    warning_type: EarWarningType, 
+    webhook: WebhookClient,
+    warning_type: EarWarningType,
     recovery_message: str
 ) -> str:
     """ Requires a webhook loaded with the webhook url from ear.settings and
-    should be used to send a recovery message. Returns the response code from 
+    should be used to send a recovery message. Returns the response code from
     the WebHookClient"""
-    response = webhook.send(
-        text="fallback",
-        blocks=[
-            {
-                "type": "section",
-                "text": {
-                    "type": "mrkdwn",
-                    "text": f"*S3 Ear Recovery!:*\n {warning_type.value}: {recovery_message}"
-                }
-            }
-        ]
-    )
-    try:
-        status_code = response.status_code
-    except:
-        return "No status code returned in webhook response!"
-    return status_code
+    return _post_to_slack(webhook, "S3 Ear Recovery!:", warning_type, recovery_message)
 
 
 def short_log_time() -> str:
-    time_utc = pendulum.now("UTC")
+    time_utc = datetime.now(timezone.utc)
     return time_utc.strftime("%Y-%m-%d %H:%M:%S")
 
 
@@ -98,23 +93,23 @@ class BasicLog:
         cls,
         level: str,  # TODO: turn this into an enum
         log_note: str,
-        timestamp: Optional[pendulum.datetime] = None,
+        timestamp: Optional[datetime] = None,
     ) -> str:
         """
         Formats a single line summary of message receipt/publication.
 
         Args:
             log_note: the info level note
-            timestamp: "pendulum.now("UTC") by default"
+            timestamp: "datetime.now(timezone.utc) by default"
 
         Returns:
             Formatted string.
         """
         try:
             if timestamp is None:
-                timestamp = pendulum.now("UTC")
+                timestamp = datetime.now(timezone.utc)
             return cls.DEFAULT_FORMAT.format(
-                timestamp=timestamp.isoformat(),
+                timestamp=timestamp.isoformat(timespec="milliseconds"),
                 level=level,
                 log_note=log_note,
             )